@@ -1,37 +1,144 @@
 
 # backend/main.py - minimal FinMuse backend (FastAPI)
-import os, json, sqlite3, uuid, datetime, logging, asyncio
+import os, sqlite3, uuid, datetime, logging, asyncio, threading, contextlib, collections, itertools, hashlib, time, gzip, math, heapq
 from typing import Optional
-from fastapi import FastAPI, HTTPException, Header, Response
+from html import escape as _esc
+from fastapi import FastAPI, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 import httpx
+import orjson
+import jinja2
+import aiofiles
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 ADMIN_SECRET = os.getenv("FINMUSE_ADMIN_SECRET", "change_me")
 DB_PATH = os.getenv("FINMUSE_DB_PATH", "finmuse.db")
 DAILY_LLM_CALL_LIMIT = int(os.getenv("DAILY_LLM_CALL_LIMIT", "100"))
+LLM_CONCURRENCY = int(os.getenv("FINMUSE_LLM_CONCURRENCY", "5"))
+NEWS_CACHE_TTL = int(os.getenv("FINMUSE_NEWS_CACHE_TTL", "30"))
 SITE_DOMAIN = os.getenv("SITE_DOMAIN", "http://localhost:8000")
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+_SITE = SITE_DOMAIN.rstrip("/")
+_ARTDIR = os.path.join(STATIC_DIR, "articles")
+_NEWSAPI_BASE = f"https://newsapi.org/v2/top-headlines?category=business&apiKey={NEWS_API_KEY}" if NEWS_API_KEY else None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("finmuse")
 
+# compiled once; autoescape covers title/summary/evidence fields
+_jinja = jinja2.Environment(loader=jinja2.FileSystemLoader(TEMPLATE_DIR), autoescape=True)
+ARTICLE_TPL = _jinja.get_template("article.html")
+
 app = FastAPI(title="FinMuse Backend")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(GZipMiddleware, minimum_size=512)
 
-os.makedirs(STATIC_DIR, exist_ok=True)
+os.makedirs(_ARTDIR, exist_ok=True)
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+_PRECOMPRESSED_TYPES = {'.html': 'text/html', '.xml': 'application/xml'}
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    # honour q-values: "gzip;q=0" or "*;q=0" without an explicit gzip means no
+    qs = {}
+    for part in accept_encoding.split(','):
+        coding, *params = [p.strip() for p in part.split(';')]
+        q = 1.0
+        for param in params:
+            k, _, v = param.partition('=')
+            if k.strip().lower() == 'q':
+                try: q = float(v)
+                except ValueError: q = 0.0
+        if coding: qs[coding.lower()] = q
+    return qs.get('gzip', qs.get('*', 0.0)) > 0
+
+@app.middleware('http')
+async def serve_precompressed(request: Request, call_next):
+    # generated pages/feeds have a .gz sibling written next to them; hand it out as-is
+    path = request.url.path
+    if request.method in ('GET', 'HEAD') and path.startswith('/static/') and _accepts_gzip(request.headers.get('accept-encoding', '')):
+        media_type = _PRECOMPRESSED_TYPES.get(os.path.splitext(path)[1])
+        full = os.path.normpath(os.path.join(STATIC_DIR, path[len('/static/'):]))
+        if media_type and full.startswith(STATIC_DIR + os.sep) and os.path.isfile(full + '.gz'):
+            return FileResponse(full + '.gz', media_type=media_type, headers={'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+    return await call_next(request)
+
+# per-client token buckets: (path prefix, requests, per seconds); first matching prefix wins
+RATE_LIMITS = (('/api/', 60, 60),)
+ADMIN_SCRAPE_LIMIT = (1, 60)
+_buckets = {}
+_BUCKETS_SWEEP_AT = 10000
+_last_sweep = 0.0
+
+def _sweep_buckets(now: float):
+    # drop only buckets that have fully refilled; recreating them later is lossless
+    global _last_sweep
+    if now - _last_sweep < 1.0: return
+    _last_sweep = now
+    for key, (tokens, last, limit, period) in list(_buckets.items()):
+        if tokens + (now - last) * limit / period >= limit: del _buckets[key]
+
+def _take_token(key, limit: int, period: int):
+    # returns None if allowed, else seconds until the next token
+    now = time.monotonic()
+    if key not in _buckets and len(_buckets) >= _BUCKETS_SWEEP_AT: _sweep_buckets(now)
+    tokens, last, _, _ = _buckets.get(key, (limit, now, limit, period))
+    tokens = min(limit, tokens + (now - last) * limit / period)
+    if tokens < 1:
+        _buckets[key] = (tokens, now, limit, period)
+        return math.ceil((1 - tokens) * period / limit)
+    _buckets[key] = (tokens - 1, now, limit, period)
+    return None
+
+@app.middleware('http')
+async def rate_limit(request: Request, call_next):
+    path = request.url.path
+    for prefix, limit, period in RATE_LIMITS:
+        if not path.startswith(prefix): continue
+        retry = _take_token((prefix, request.client.host if request.client else '-'), limit, period)
+        if retry is not None:
+            return JSONResponse({'detail': 'rate limited'}, status_code=429, headers={'Retry-After': str(retry)})
+        break
+    return await call_next(request)
+
+# registered last so it is the outermost layer and 429s/precompressed files still get CORS headers
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+
+# one process-wide connection (autocommit, WAL); writers serialize on _write_lock
+_DB = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+_DB.row_factory = sqlite3.Row
+for _pragma in ("journal_mode=WAL", "synchronous=NORMAL", "temp_store=MEMORY", "cache_size=-20000"):
+    _DB.execute(f"PRAGMA {_pragma}")
+_write_lock = threading.Lock()
+
+_META_GET_SQL = "SELECT v FROM meta WHERE k = ?"
+_META_SET_SQL = "INSERT OR REPLACE INTO meta (k,v) VALUES (?,?)"
+_INSERT_ARTICLE_SQL = "INSERT OR IGNORE INTO articles (id,title,source,original_url,published_at,raw_text,status,created_at) VALUES (?,?,?,?,?,?,?,?)"
+_UPDATE_SUMMARY_SQL = "UPDATE articles SET tl_dr = ?, summary_pro = ?, evidence = ?, confidence = ?, status = ? WHERE id = ?"
+
 def get_conn():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return _DB
+
+@contextlib.contextmanager
+def _write_tx():
+    # one explicit transaction (one fsync) for a batch of writes
+    with _write_lock:
+        cur = _DB.cursor(); cur.execute("BEGIN")
+        try:
+            yield cur
+            cur.execute("COMMIT")
+        except BaseException:
+            # never leave the shared connection inside an open transaction
+            if _DB.in_transaction: _DB.execute("ROLLBACK")
+            raise
 
 def init_db():
     conn = get_conn(); cur = conn.cursor()
-    cur.execute(\"\"\"CREATE TABLE IF NOT EXISTS articles (
+    cur.execute("""CREATE TABLE IF NOT EXISTS articles (
       id TEXT PRIMARY KEY,
       title TEXT,
       source TEXT,
@@ -44,35 +151,60 @@ def init_db():
       confidence REAL,
       status TEXT,
       created_at TEXT
-    )\"\"\")
-    cur.execute(\"\"\"CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)\"\"\")
-    conn.commit(); conn.close()
+    )""")
+    # index-ordered scans for the new-queue, sitemap and /api/news queries (original_url is covered by UNIQUE)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_articles_status_created ON articles(status, created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_articles_status_pub ON articles(status, published_at DESC)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_articles_pub ON articles(published_at DESC)")
+    cur.execute("""CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)""")
 
 init_db()
 
 def _meta_get(k: str):
-    conn = get_conn(); cur = conn.cursor(); cur.execute("SELECT v FROM meta WHERE k = ?", (k,))
-    r = cur.fetchone(); conn.close(); return r[0] if r else None
+    conn = get_conn(); cur = conn.cursor(); cur.execute(_META_GET_SQL, (k,))
+    r = cur.fetchone(); return r[0] if r else None
+
+# daily LLM call counter lives in memory; meta is only written every LLM_FLUSH_EVERY calls, on reset and at shutdown
+LLM_FLUSH_EVERY = 10
+_llm = {'date': None, 'count': 0}
+_llm_lock = threading.Lock()
 
-def _meta_set(k: str, v: str):
-    conn = get_conn(); cur = conn.cursor(); cur.execute("INSERT OR REPLACE INTO meta (k,v) VALUES (?,?)", (k, str(v)))
-    conn.commit(); conn.close()
+def _llm_load():
+    today = datetime.date.today().isoformat()
+    try: count = int(_meta_get("llm_calls_today") or "0") if _meta_get("llm_last_reset") == today else 0
+    except: count = 0
+    _llm.update(date=today, count=count)
+
+_llm_load()
+
+def llm_flush():
+    with _llm_lock:
+        snap = [("llm_last_reset", _llm['date']), ("llm_calls_today", str(_llm['count']))]
+    with _write_tx() as wcur:
+        wcur.executemany(_META_SET_SQL, snap)
 
 def llm_reset_if_needed():
     today = datetime.date.today().isoformat()
-    last = _meta_get("llm_last_reset")
-    if last != today:
-        _meta_set("llm_last_reset", today); _meta_set("llm_calls_today", "0")
+    with _llm_lock:
+        if _llm['date'] == today: return
+        _llm.update(date=today, count=0)
+    llm_flush()
 
 def llm_get_calls():
-    llm_reset_if_needed(); v = _meta_get("llm_calls_today") or "0"
-    try: return int(v)
-    except: return 0
+    llm_reset_if_needed(); return _llm['count']
 
-def llm_increment():
-    llm_reset_if_needed(); calls = llm_get_calls() + 1; _meta_set("llm_calls_today", str(calls)); return calls
+def llm_reserve():
+    # check and take a slot in one step so concurrent summaries can't all pass the cap before any is counted
+    llm_reset_if_needed()
+    with _llm_lock:
+        if _llm['count'] >= DAILY_LLM_CALL_LIMIT: return False
+        _llm['count'] += 1; calls = _llm['count']
+    if calls % LLM_FLUSH_EVERY == 0: llm_flush()
+    return True
 
-def llm_allow_call(): return llm_get_calls() < DAILY_LLM_CALL_LIMIT
+def llm_release():
+    with _llm_lock:
+        _llm['count'] = max(0, _llm['count'] - 1)
 
 async def call_openai_chat(messages: list, model: str = "gpt-4o-mini", max_tokens: int = 500, timeout: int = 30):
     if not OPENAI_API_KEY:
@@ -81,121 +213,91 @@ async def call_openai_chat(messages: list, model: str = "gpt-4o-mini", max_token
     headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
     payload = {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": 0.0}
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            r = await client.post(url, headers=headers, json=payload)
-            if r.status_code != 200:
-                logger.warning("OpenAI error %s %s", r.status_code, r.text[:300]); return None
-            data = r.json()
-            if "choices" in data and len(data["choices"])>0:
-                choice = data["choices"][0]; msg = choice.get("message") or {}; return msg.get("content") or choice.get("text")
-            return None
+        r = await app.state.http.post(url, headers=headers, json=payload, timeout=timeout)
+        if r.status_code != 200:
+            logger.warning("OpenAI error %s %s", r.status_code, r.text[:300]); return None
+        data = r.json()
+        if "choices" in data and len(data["choices"])>0:
+            choice = data["choices"][0]; msg = choice.get("message") or {}; return msg.get("content") or choice.get("text")
+        return None
     except Exception as e:
         logger.exception("call_openai_chat exception: %s", e); return None
 
 def summarizer_fallback(text: str) -> str:
     if not text: return ""
-    s = text.replace("\\n"," ").split(". ")
-    return (". ".join(s[:2]) + ("." if len(s)>0 else ""))[:700]
+    # only the first two sentences are kept, so stop splitting after them
+    s = text.replace("\n"," ").split(". ", 2)[:2]
+    return (". ".join(s) + ("." if len(s)>0 else ""))[:700]
 
 async def generate_pro_summary(raw_text: str, title: str):
     easy = summarizer_fallback(raw_text)
-    if OPENAI_API_KEY and llm_allow_call():
+    if OPENAI_API_KEY and llm_reserve():
         sys_prompt = ("You are a senior financial analyst. Output STRICT JSON only. Keys: tl_dr, summary, impact_short, impact_mechanism, evidence (list of {source,quote,url}), confidence. Do NOT invent facts.")
         messages = [{"role":"system","content":sys_prompt},{"role":"user","content":f"Title: {title}\\nText:\\n{raw_text[:6000]}"}]
         ai_resp = await call_openai_chat(messages, max_tokens=500)
-        if ai_resp:
+        if not ai_resp:
+            llm_release()
+        else:
             try:
-                parsed = json.loads(ai_resp)
-                tl = parsed.get("tl_dr") or easy
-                summary = parsed.get("summary") or easy
-                evidence = parsed.get("evidence") or []
+                parsed = orjson.loads(ai_resp)
+                # LLM output is untrusted: anything that isn't the expected type falls back
+                tl = parsed.get("tl_dr"); summary = parsed.get("summary"); evidence = parsed.get("evidence")
+                tl = tl if isinstance(tl, str) and tl else easy
+                summary = summary if isinstance(summary, str) and summary else easy
+                evidence = [ev for ev in evidence if isinstance(ev, dict)] if isinstance(evidence, list) else []
                 conf = float(parsed.get("confidence") or 0.5)
-                llm_increment()
                 return tl, summary, evidence, conf
             except Exception:
-                llm_increment()
                 return easy, ai_resp.strip()[:1200], [], 0.4
     return easy, easy, [], 0.5
 
-async def fetch_from_newsapi(page_size:int=20):
-    if not NEWS_API_KEY:
-        return []
-    url = f"https://newsapi.org/v2/top-headlines?category=business&pageSize={page_size}&apiKey={NEWS_API_KEY}"
-    try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            r = await client.get(url)
-            if r.status_code != 200:
-                logger.warning("NewsAPI error %s %s", r.status_code, r.text[:200]); return []
-            return r.json().get("articles", [])
-    except Exception as e:
-        logger.exception("fetch_from_newsapi error: %s", e); return []
+async def _write_static(path: str, text: str):
+    data = text.encode('utf-8')
+    async with aiofiles.open(path, 'wb') as f: await f.write(data)
+    gz = await asyncio.to_thread(gzip.compress, data, 6)
+    async with aiofiles.open(path + '.gz', 'wb') as f: await f.write(gz)
 
-def generate_article_html(article):
+async def generate_article_html(article):
     aid = article['id']; title = article['title']; summary = article.get('summary_pro') or article.get('tl_dr') or ''; tl = article.get('tl_dr') or ''
     evidence = article.get('evidence') or []; published = article.get('published_at') or article.get('created_at')
-    url = f"{SITE_DOMAIN.rstrip('/')}/articles/{aid}.html"
+    url = f"{_SITE}/articles/{aid}.html"
     json_ld = {"@context":"https://schema.org","@type":"NewsArticle","headline": title,"datePublished": published,"mainEntityOfPage": url,"publisher": {"@type":"Organization","name":"FinMuse"},"articleBody": summary[:4000]}
-    parts = []
-    parts.append("<!doctype html>")
-    parts.append("<html lang='ko'><head>")
-    parts.append("<meta charset='utf-8'/>")
-    parts.append("<meta name='viewport' content='width=device-width,initial-scale=1'/>")
-    parts.append(f"<title>{title} | FinMuse</title>")
-    parts.append(f"<meta name='description' content='{summary[:160]}'/>")
-    parts.append(f"<link rel='canonical' href='{url}'/>")
-    parts.append(f"<meta property='og:title' content='{title}'/>")
-    parts.append(f"<meta property='og:description' content='{summary[:200]}'/>")
-    parts.append("<script type='application/ld+json'>")
-    parts.append(json.dumps(json_ld, ensure_ascii=False))
-    parts.append("</script>")
-    parts.append("<link rel='stylesheet' href='/static/style.css'>")
-    parts.append("</head><body><main class='page'><article class='article'>")
-    parts.append(f"<h1>{title}</h1>")
-    parts.append(f"<div class='meta'>Source: {article.get('source','')}, Published: {published}</div>")
-    parts.append(f"<section class='tl-dr'><strong>요약:</strong><p>{tl}</p></section>")
-    parts.append(f"<section class='pro'><strong>전문가 분석:</strong><p>{summary}</p></section>")
-    parts.append("<section class='evidence'><strong>근거:</strong><ul>")
-    for ev in evidence:
-        src = ev.get('source',''); quote = ev.get('quote','').replace('<','&lt;').replace('>','&gt;'); link = ev.get('url','')
-        parts.append(f"<li>{src}: \"{quote}\" <a href='{link}' target='_blank' rel='nofollow'>원문</a></li>")
-    parts.append("</ul></section>")
-    parts.append("<footer class='footer'>FinMuse - 자동 생성 리포트</footer>")
-    parts.append("</article></main></body></html>")
-    html = "".join(parts)
-    artdir = os.path.join(STATIC_DIR, 'articles'); os.makedirs(artdir, exist_ok=True)
-    path = os.path.join(artdir, f"{aid}.html")
-    with open(path, 'w', encoding='utf-8') as f: f.write(html)
+    # JSON-LD is emitted raw inside <script>, so only "</" needs neutralizing
+    json_ld_str = orjson.dumps(json_ld).decode().replace("</", "<\\/")
+    html = ARTICLE_TPL.render(title=title, summary=summary, tl=tl, url=url, published=published, source=article.get('source',''), evidence=evidence, json_ld=json_ld_str)
+    path = os.path.join(_ARTDIR, f"{aid}.html")
+    await _write_static(path, html)
     return path
 
-def update_sitemap_and_rss():
-    conn = get_conn(); cur = conn.cursor()
-    cur.execute("SELECT id, title, published_at, created_at FROM articles WHERE status = 'published' ORDER BY published_at DESC LIMIT 1000")
-    rows = cur.fetchall()
-    sitemap = ['<?xml version="1.0" encoding="UTF-8"?>\\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
-    for r in rows:
-        aid = r['id']; pub = r['published_at'] or r['created_at']
-        url = f"{SITE_DOMAIN.rstrip('/')}/articles/{aid}.html"
-        sitemap.append(f"<url><loc>{url}</loc><lastmod>{pub}</lastmod></url>")
-    sitemap.append('</urlset>')
-    with open(os.path.join(STATIC_DIR, 'sitemap.xml'), 'w', encoding='utf-8') as f: f.write('\\n'.join(sitemap))
-    rss_items = []
-    for r in rows[:50]:
-        aid = r['id']; title = r['title']; pub = r['published_at'] or r['created_at']
-        url = f"{SITE_DOMAIN.rstrip('/')}/articles/{aid}.html"
-        rss_items.append(f"<item><title>{title}</title><link>{url}</link><pubDate>{pub}</pubDate></item>")
-    rss = f"<?xml version='1.0' encoding='utf-8'?><rss version='2.0'><channel><title>FinMuse</title>{''.join(rss_items)}</channel></rss>"
-    with open(os.path.join(STATIC_DIR, 'rss.xml'), 'w', encoding='utf-8') as f: f.write(rss)
+SITEMAP_MAX_URLS = 1000
+
+def load_recent_published():
+    cur = get_conn().cursor()
+    cur.execute("SELECT id, title, published_at, created_at FROM articles WHERE status = 'published' ORDER BY published_at DESC LIMIT ?", (SITEMAP_MAX_URLS,))
+    return collections.deque(((r['id'], r['title'], r['published_at'] or r['created_at']) for r in cur.fetchall()), maxlen=SITEMAP_MAX_URLS)
+
+def _pub_key(entry): return entry[2] or ''
+
+async def update_sitemap_and_rss(published=()):
+    # app.state.recent mirrors the newest published articles (published_at DESC), so no DB round-trip here;
+    # new entries are merged by date since NewsAPI items are often older than rows already stored
+    new = sorted(((a['id'], a['title'], a.get('published_at') or a.get('created_at')) for a in published), key=_pub_key, reverse=True)
+    recent = app.state.recent = collections.deque(itertools.islice(heapq.merge(app.state.recent, new, key=_pub_key, reverse=True), SITEMAP_MAX_URLS), maxlen=SITEMAP_MAX_URLS)
+    sitemap = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n' + \
+        ''.join(f"<url><loc>{_SITE}/articles/{aid}.html</loc><lastmod>{pub}</lastmod></url>\n" for aid, _, pub in recent) + '</urlset>'
+    await _write_static(os.path.join(STATIC_DIR, 'sitemap.xml'), sitemap)
+    rss_items = ''.join(f"<item><title>{_esc(title or '')}</title><link>{_SITE}/articles/{aid}.html</link><pubDate>{pub}</pubDate></item>" for aid, title, pub in itertools.islice(recent, 50))
+    rss = f"<?xml version='1.0' encoding='utf-8'?><rss version='2.0'><channel><title>FinMuse</title>{rss_items}</channel></rss>"
+    await _write_static(os.path.join(STATIC_DIR, 'rss.xml'), rss)
 
 async def fetch_from_newsapi(page_size:int=20):
     if not NEWS_API_KEY:
         return []
-    url = f"https://newsapi.org/v2/top-headlines?category=business&pageSize={page_size}&apiKey={NEWS_API_KEY}"
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            r = await client.get(url)
-            if r.status_code != 200:
-                logger.warning("NewsAPI error %s %s", r.status_code, r.text[:200]); return []
-            return r.json().get("articles", [])
+        r = await app.state.http.get(f"{_NEWSAPI_BASE}&pageSize={page_size}", timeout=20.0)
+        if r.status_code != 200:
+            logger.warning("NewsAPI error %s %s", r.status_code, r.text[:200]); return []
+        return orjson.loads(r.content).get("articles", [])
     except Exception as e:
         logger.exception("fetch_from_newsapi error: %s", e); return []
 
@@ -204,40 +306,51 @@ async def scrape_and_process():
     fetched = await fetch_from_newsapi(20)
     if not fetched:
         fetched = [{'title':'Sample: Fed cuts rate by 25 bps','url':'https://example.com/fed-cut','source':{'name':'ExampleNews'},'publishedAt':datetime.datetime.utcnow().isoformat()+'Z','content':'The Fed lowered rates by 25 basis points citing slowing growth.'}]
-    conn = get_conn(); cur = conn.cursor(); saved = 0
+    conn = get_conn(); cur = conn.cursor(); saved = 0; rows_to_insert = []
+    # one urandom call for the whole batch instead of one per uuid4()
+    rnd = os.urandom(16 * len(fetched)); ids = (str(uuid.UUID(bytes=rnd[i:i+16], version=4)) for i in range(0, len(rnd), 16))
     for a in fetched:
         url = a.get('url'); title = a.get('title') or ''
         src = (a.get('source') or {}).get('name') or a.get('source') or 'unknown'
         published = a.get('publishedAt') or datetime.datetime.utcnow().isoformat()+'Z'
         raw = a.get('content') or a.get('description') or title
         if not url: continue
+        rows_to_insert.append((next(ids), title, src, url, published, raw, 'new', datetime.datetime.utcnow().isoformat()+'Z'))
+    try:
+        # already-known URLs are skipped by the UNIQUE(original_url) index; rowcount is what actually landed
+        with _write_tx() as wcur:
+            wcur.executemany(_INSERT_ARTICLE_SQL, rows_to_insert); saved = wcur.rowcount
+        _news_cache.clear()
+    except Exception as e:
+        logger.exception('db insert error: %s', e)
+    cur.execute("SELECT id,title,raw_text,source,published_at FROM articles WHERE status = 'new' ORDER BY created_at LIMIT 20")
+    rows = cur.fetchall(); updates = []; to_publish = []
+    sem = asyncio.Semaphore(LLM_CONCURRENCY)
+    async def _one(r):
+        async with sem:
+            return r, await generate_pro_summary(r['raw_text'], r['title'])
+    for res in await asyncio.gather(*[_one(r) for r in rows], return_exceptions=True):
+        if isinstance(res, Exception):
+            logger.error('process article failed: %s', res, exc_info=res); continue
+        r, (tl, summary, evidence, conf) = res
+        aid = r['id']; title = r['title']; src = r['source']; published = r['published_at']
+        updates.append((tl, summary, orjson.dumps(evidence).decode(), conf, 'published' if conf>=0.5 else 'draft', aid))
+        if conf>=0.5:
+            to_publish.append({'id':aid,'title':title,'tl_dr':tl,'summary_pro':summary,'evidence':evidence,'published_at':published,'created_at':datetime.datetime.utcnow().isoformat()+'Z','source':src})
+    if updates:
         try:
-            cur.execute("SELECT id FROM articles WHERE original_url = ?", (url,))
-            if cur.fetchone(): continue
-            _id = str(uuid.uuid4())
-            cur.execute("INSERT INTO articles (id,title,source,original_url,published_at,raw_text,status,created_at) VALUES (?,?,?,?,?,?,?,?)",
-                        (_id, title, src, url, published, raw, 'new', datetime.datetime.utcnow().isoformat()+'Z'))
-            conn.commit(); saved += 1
+            with _write_tx() as wcur:
+                wcur.executemany(_UPDATE_SUMMARY_SQL, updates)
+            _news_cache.clear()
         except Exception as e:
-            logger.exception('db insert error: %s', e)
-    conn.close()
-    conn = get_conn(); cur = conn.cursor()
-    cur.execute("SELECT id,title,raw_text,source,published_at FROM articles WHERE status = 'new' ORDER BY created_at LIMIT 20")
-    rows = cur.fetchall()
-    for r in rows:
-        aid = r['id']; title = r['title']; raw = r['raw_text']; src = r['source']; published = r['published_at']
+            logger.exception('db update error: %s', e); to_publish = []
+    for article in to_publish:
         try:
-            tl, summary, evidence, conf = await generate_pro_summary(raw, title)
-            cur.execute("UPDATE articles SET tl_dr = ?, summary_pro = ?, evidence = ?, confidence = ?, status = ? WHERE id = ?",
-                        (tl, summary, json.dumps(evidence, ensure_ascii=False), conf, 'published' if conf>=0.5 else 'draft', aid))
-            conn.commit()
-            article = {'id':aid,'title':title,'tl_dr':tl,'summary_pro':summary,'evidence':evidence,'published_at':published,'created_at':datetime.datetime.utcnow().isoformat()+'Z','source':src}
-            if conf>=0.5:
-                generate_article_html(article)
-            update_sitemap_and_rss()
+            await generate_article_html(article)
         except Exception as e:
             logger.exception('process article failed: %s', e)
-    conn.close()
+    if to_publish:
+        await update_sitemap_and_rss(to_publish)
     logger.info('Scrape cycle finished, saved %d new articles', saved)
 
 async def periodic_runner():
@@ -251,43 +364,77 @@ async def periodic_runner():
 
 @app.on_event('startup')
 async def startup_event():
-    os.makedirs(os.path.join(STATIC_DIR,'articles'), exist_ok=True)
+    app.state.recent = load_recent_published()
+    # shared keep-alive pool for OpenAI/NewsAPI so calls skip DNS + TLS setup
+    app.state.http = httpx.AsyncClient(http2=True, timeout=httpx.Timeout(30.0), limits=httpx.Limits(max_keepalive_connections=20, max_connections=50))
     asyncio.create_task(periodic_runner())
 
+@app.on_event('shutdown')
+async def shutdown_event():
+    await app.state.http.aclose()
+    llm_flush()
+
 @app.get('/health')
 def health():
     return {'status':'ok','time': datetime.datetime.utcnow().isoformat()+'Z','llm_calls_today': llm_get_calls()}
 
 @app.post('/admin/scrape')
-async def admin_scrape(x_admin_secret: Optional[str] = Header(None)):
+async def admin_scrape(request: Request, x_admin_secret: Optional[str] = Header(None)):
     if x_admin_secret != ADMIN_SECRET:
         raise HTTPException(status_code=401, detail='unauthorized')
+    # charged only after auth, so unauthenticated callers can't lock the admin out
+    retry = _take_token(('/admin/scrape', request.client.host if request.client else '-'), *ADMIN_SCRAPE_LIMIT)
+    if retry is not None:
+        raise HTTPException(status_code=429, detail='rate limited', headers={'Retry-After': str(retry)})
     await scrape_and_process()
     return {'status':'ok'}
 
-@app.get('/api/news')
-def api_news(limit: int = 20):
+# limit -> (expires_at, body, etag); cleared by scrape_and_process whenever articles change
+_news_cache = {}
+
+def _news_payload(limit: int):
+    hit = _news_cache.get(limit)
+    if hit and hit[0] > time.monotonic():
+        return hit[1], hit[2]
     conn = get_conn(); cur = conn.cursor()
     cur.execute("SELECT id,title,source,published_at,tl_dr,confidence,status FROM articles ORDER BY published_at DESC LIMIT ?", (limit,))
-    rows = cur.fetchall(); items = []
-    for r in rows:
-        items.append({'id': r['id'], 'title': r['title'], 'source': r['source'], 'published_at': r['published_at'], 'summary': r['tl_dr'], 'confidence': float(r['confidence'] or 0.5), 'status': r['status']})
-    conn.close()
-    return {'items': items, 'meta': {'count': len(items), 'generated_at': datetime.datetime.utcnow().isoformat()+'Z'}}
+    items = [{'id': r['id'], 'title': r['title'], 'source': r['source'], 'published_at': r['published_at'], 'summary': r['tl_dr'], 'confidence': float(r['confidence'] or 0.5), 'status': r['status']} for r in cur.fetchall()]
+    items_json = orjson.dumps(items)
+    body = orjson.dumps({'items': items, 'meta': {'count': len(items), 'generated_at': datetime.datetime.utcnow().isoformat()+'Z'}})
+    # tag the items only, so a re-render with a new generated_at still matches; weak because
+    # GZipMiddleware may serve the same tag for gzip and identity codings
+    etag = 'W/"' + hashlib.md5(items_json).hexdigest() + '"'
+    if len(_news_cache) >= 64: _news_cache.clear()
+    _news_cache[limit] = (time.monotonic() + NEWS_CACHE_TTL, body, etag)
+    return body, etag
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/ prefixes are ignored, lists and * are allowed
+    if not if_none_match: return False
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return '*' in tags or etag.removeprefix('W/') in (t.removeprefix('W/') for t in tags)
+
+@app.get('/api/news')
+def api_news(limit: int = 20, if_none_match: Optional[str] = Header(None)):
+    body, etag = _news_payload(max(1, min(limit, 100)))
+    headers = {'ETag': etag, 'Cache-Control': 'max-age=60'}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
 
 @app.get('/api/article/{article_id}')
 def api_article(article_id: str):
     conn = get_conn(); cur = conn.cursor()
     cur.execute("SELECT * FROM articles WHERE id = ?", (article_id,))
-    r = cur.fetchone(); conn.close()
+    r = cur.fetchone()
     if not r:
         raise HTTPException(status_code=404, detail='not found')
-    item = dict(r); item['evidence'] = json.loads(item['evidence']) if item.get('evidence') else []
+    item = dict(r); item['evidence'] = orjson.loads(item['evidence']) if item.get('evidence') else []
     return item
 
 @app.get('/')
 async def index():
     idx = os.path.join(STATIC_DIR, 'index.html')
     if os.path.isfile(idx):
-        return Response(open(idx,'rb').read(), media_type='text/html')
+        return FileResponse(idx, media_type='text/html')
     return {'service': 'FinMuse running'}
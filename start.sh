@@ -10,4 +10,4 @@ if [ -f package.json ]; then
   cp -r build/* ../backend/static/ || true
 fi
 cd ../backend
-uvicorn main:app --host 0.0.0.0 --port ${PORT:-8000}
+uvicorn main:app --host 0.0.0.0 --port ${PORT:-8000} --loop uvloop --http httptools